@@ -69,6 +69,14 @@ with st.sidebar:
         else:
             st.warning("Your role cannot upload files.")
 
+        # --- AVAILABLE SOURCES (from the catalog, no Qdrant query) ---
+        docs = vm.get_document_catalog()
+        if docs:
+            with st.expander(f"📚 Available Sources ({len(docs)})"):
+                for doc in docs:
+                    st.markdown(f"**{doc.file_name}** ({doc.visibility})")
+                    st.caption(f"{doc.owner} · {doc.chunk_count} chunks · {doc.uploaded_at}")
+
     else:
         st.warning("Please Log In to access the system.")
 
@@ -106,7 +114,8 @@ else:
             if msg.debug_sources:
                 with st.expander(f"📚 View {len(msg.debug_sources)} References (Confidence: {msg.confidence:.2f})"):
                     for idx, src in enumerate(msg.debug_sources):
-                        st.markdown(f"**{idx + 1}. {src.file_name}** ({src.score:.2f})")
+                        files = ", ".join(src.file_refs) if src.file_refs else src.file_name
+                        st.markdown(f"**{idx + 1}. {files}** ({src.score:.2f})")
                         st.caption(f"...{src.content_snippet}...")
 
     # B. Chat Input
@@ -141,5 +150,6 @@ else:
             if final_msg.debug_sources:
                 with sources_placeholder.expander(f"📚 Used {len(final_msg.debug_sources)} References"):
                     for idx, src in enumerate(final_msg.debug_sources):
-                        st.markdown(f"**{idx + 1}. {src.file_name}**")
+                        files = ", ".join(src.file_refs) if src.file_refs else src.file_name
+                        st.markdown(f"**{idx + 1}. {files}**")
                         st.caption(src.content_snippet)
\ No newline at end of file
@@ -9,6 +9,20 @@ class SourceNode:
     file_name: str
     content_snippet: str  # The actual text paragraph
     score: float  # The relevance score (0.0 to 1.0)
+    # Every file containing this chunk (near-duplicates are stored once)
+    file_refs: List[str] = field(default_factory=list)
+
+@dataclass
+class DocumentInfo:
+    """One entry of the document catalog (metadata only, no vectors)"""
+    file_name: str
+    owner: str
+    visibility: str  # 'private' or 'global'
+    chunk_count: int  # chunks stored in Qdrant
+    size_bytes: int
+    uploaded_at: str  # ISO timestamp of the latest upload
+    duplicate_chunks: int = 0  # chunks merged into an existing near-duplicate
+    chunk_stats: dict = field(default_factory=dict)  # chunk size distribution of the latest upload
 
 @dataclass
 class ChatMessage:
@@ -26,4 +40,10 @@ class CRAGResult:
     # We keep this for backward compatibility if needed, or simple string lists
     sources: List[str] = field(default_factory=list)
 
-    confidence: float = 0.0
\ No newline at end of file
+    confidence: float = 0.0
+
+    # Per-stage wall-clock timings in seconds (filled by batch answering)
+    timings: dict = field(default_factory=dict)
+
+    # Set when the pipeline failed before generation (e.g. batch retrieval), empty otherwise
+    error: str = ""
@@ -0,0 +1,95 @@
+# FYP_Workbench/dedup.py
+"""
+Duplicate chunk detection.
+
+Only chunks whose normalized text is identical are merged: near-duplicates are
+often revisions ("30 days" -> "14 days"), and merging them would attribute text
+to a file that doesn't contain it.
+
+The index maps (visibility scope, content key) to the canonical chunk's node_id.
+Scopes are 'global' or one user's private space, so a private chunk is never
+merged into another user's (or a global) chunk. It lives in SQLite, so an upload
+only writes its own rows and the database lock makes decide + reserve atomic
+across workers, without holding anything while the chunks are embedded.
+"""
+import hashlib
+import re
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+
+# A reserved canonical chunk that isn't in Qdrant yet is treated as "still being
+# embedded by another upload" for this long, and as abandoned afterwards.
+RESERVATION_TTL = 600  # seconds
+
+
+def normalize(text):
+    """Lowercase, strip punctuation and collapse whitespace."""
+    return " ".join(re.findall(r"\w+", text.lower()))
+
+
+def content_key(text):
+    """Exact-match key for a chunk (used at upload and to group identical sources at retrieval)."""
+    return hashlib.md5(normalize(text).encode("utf-8")).hexdigest()
+
+
+def scope_key(visibility, owner):
+    return "global" if visibility == "global" else f"private:{owner}"
+
+
+class DedupIndex:
+    """Canonical chunk per (scope, content key), stored in a SQLite table."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+
+    def _connect(self):
+        # Autocommit mode: transaction() issues BEGIN / COMMIT itself
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "scope TEXT NOT NULL, key TEXT NOT NULL, node_id TEXT NOT NULL, reserved_at REAL NOT NULL, "
+            "PRIMARY KEY (scope, key))"
+        )
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Holds the database write lock, so lookups and reservations made inside are
+        atomic across workers. Keep it short: embed after leaving the block.
+        """
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._conn = conn
+            try:
+                yield self
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            finally:
+                self._conn = None
+
+    def find(self, scope, key):
+        """Returns (node_id, reserved_at) of the canonical chunk, or None. Call inside transaction()."""
+        return self._conn.execute(
+            "SELECT node_id, reserved_at FROM chunks WHERE scope = ? AND key = ?", (scope, key)
+        ).fetchone()
+
+    def reserve(self, scope, key, node_id):
+        """Makes node_id the canonical chunk for key. Call inside transaction()."""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO chunks (scope, key, node_id, reserved_at) VALUES (?, ?, ?, ?)",
+            (scope, key, node_id, time.time()),
+        )
+
+    def release(self, node_ids):
+        """Drops the reservations of chunks that never made it into Qdrant (failed upload)."""
+        node_ids = list(node_ids)
+        if not node_ids:
+            return
+        placeholders = ",".join("?" * len(node_ids))
+        with closing(self._connect()) as conn:
+            conn.execute(f"DELETE FROM chunks WHERE node_id IN ({placeholders})", node_ids)
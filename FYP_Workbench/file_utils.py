@@ -0,0 +1,51 @@
+# FYP_Workbench/file_utils.py
+"""
+Helpers for the files several Streamlit workers share (users, catalog, dedup index).
+- file_lock: exclusive cross-process lock on a side '<path>.lock' file
+- atomic_write_json: temp file + rename, so readers never see a half-written file
+"""
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl  # POSIX
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def file_lock(path):
+    """Holds an exclusive lock for `path` (across threads and processes) while inside the block."""
+    with open(path + ".lock", 'a+') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_json(path, data, indent=None):
+    """Writes `data` to a temp file next to `path`, then renames it over `path`."""
+    base = os.path.basename(path)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{base}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -1,13 +1,44 @@
 # FYP_Workbench/fyp_service.py
+import re
 import time
-from typing import Generator, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Generator, List, Union
 from llama_index.llms.ollama import Ollama
 from llama_index.core import Settings, get_response_synthesizer, PromptTemplate
 from llama_index.core.retrievers import VectorIndexRetriever
-from llama_index.core.postprocessor import SentenceTransformerRerank
+from llama_index.core.schema import MetadataMode, NodeWithScore, TextNode
 
 import model_db
-from data_types import CRAGResult, SourceNode
+import dedup
+import inference_backends
+from data_types import CRAGResult, DocumentInfo, SourceNode
+
+
+# Inventory questions ("What documents do you have?") are answered from the catalog
+# instead of going through retrieval + LLM. Anchored at both ends so content questions
+# that merely mention documents ("What documents are required for a visa?") still go to RAG.
+_DOCS = r"(documents?|docs|files?|sources?)"
+CATALOG_QUESTION_PATTERN = re.compile(
+    r"^\s*(?:"
+    rf"(what|which)\s+{_DOCS}\s+(do\s+you\s+have|are\s+available|have\s+been\s+uploaded"
+    r"|did\s+i\s+upload|do\s+i\s+have|can\s+i\s+(see|access))(\s+access\s+to)?"
+    rf"|(list|show)(\s+me)?(\s+(all|my|your|available|uploaded))*\s+{_DOCS}(\s+you\s+have)?"
+    rf"|how\s+many\s+{_DOCS}\s+(do\s+you\s+have|are\s+(there|available)|have\s+been\s+uploaded|did\s+i\s+upload)"
+    r")\s*[?.!]*\s*$",
+    re.IGNORECASE
+)
+
+
+# With parent-child chunking, the final hits are expanded to their parent sections
+# as long as the total context stays under this many tokens. TinyLlama has 2048; the QA
+# prompt + question and the answer take ~300 each, and Llama's tokenizer counts ~15% more
+# than the tiktoken counter used here and by the splitter (3 parents of 384 tokens fit).
+PARENT_CONTEXT_BUDGET = 1200
+
+
+def _count_tokens(text):
+    # Same counter as the SentenceSplitter that sized the parents
+    return len(Settings.tokenizer(text))
 
 
 class FYPService:
@@ -24,10 +55,8 @@ class FYPService:
 
         # 2. SETUP RERANKER
         try:
-            self.reranker = SentenceTransformerRerank(
-                model="cross-encoder/ms-marco-MiniLM-L-6-v2",
-                top_n=3
-            )
+            # torch / onnx / onnx-int8, see inference_backends.py
+            self.reranker = inference_backends.get_reranker(top_n=3)
         except Exception as e:
             print(f"❌ Error initializing Reranker: {e}")
             self.reranker = None
@@ -82,6 +111,13 @@ class FYPService:
 
         print(f" [FYPService] User ({user.username}) asked: '{question}'")
 
+        # RULE 2: INVENTORY QUESTIONS COME FROM THE CATALOG (no retrieval, no LLM)
+        if self._is_catalog_question(question):
+            print("   -> 📚 Catalog question. Answering from document catalog...")
+            yield CRAGResult(answer="", source_nodes=[], confidence=1.0)
+            yield self._answer_from_catalog(user)
+            return
+
         # 1. REWRITE QUERY
         search_query = question
         if history and len(history) > 0:
@@ -98,7 +134,7 @@ class FYPService:
 
                 if raw_nodes and self.reranker:
                     nodes = self.reranker.postprocess_nodes(raw_nodes, query_str=search_query)
-                    nodes = [n for n in nodes if n.score > 0.0]
+                    nodes = self._collapse_duplicates([n for n in nodes if n.score > 0.0])
         except Exception as e:
             print(f"   -> ⚠️ Retrieval Error: {e}")
 
@@ -109,14 +145,8 @@ class FYPService:
             print(f"   -> ✅ Found {len(nodes)} docs. Streaming RAG...")
 
             # 1. Prepare Metadata (Sources)
-            rich_sources = [
-                SourceNode(
-                    file_name=n.metadata.get('file_name', 'unknown'),
-                    content_snippet=n.node.get_content()[:200] + "...",
-                    score=float(n.score) if n.score else 0.0
-                ) for n in nodes
-            ]
-            confidence = 1 / (1 + 2.718 ** (-nodes[0].score))
+            rich_sources = self._build_sources(nodes)
+            confidence = self._confidence(nodes)
 
             # YIELD 1: Metadata Header
             yield CRAGResult(answer="", source_nodes=rich_sources, confidence=confidence)
@@ -125,10 +155,11 @@ class FYPService:
             try:
                 synthesizer = get_response_synthesizer(
                     response_mode="tree_summarize",
+                    llm=self.llm,
                     text_qa_template=self._get_prompt_for_role(user.role),
                     streaming=True  # <--- ENABLE STREAMING
                 )
-                response = synthesizer.synthesize(search_query, nodes=nodes)
+                response = synthesizer.synthesize(search_query, nodes=self._expand_to_parents(nodes))
 
                 # YIELD 2+: Tokens
                 for token in response.response_gen:
@@ -158,6 +189,228 @@ class FYPService:
             except Exception as e:
                 yield f"[Error: {str(e)}]"
 
+    def answer_batch(self, questions: List[str], user, max_concurrency: int = 4) -> List[CRAGResult]:
+        """
+        Answers many standalone questions at once (offline evaluation / bulk Q&A).
+        Embedding, Qdrant search and reranking each run as ONE batch call;
+        only the LLM generations run per question, on a bounded thread pool.
+        Returns one CRAGResult per question, in the same order.
+        """
+        if user.role == "Master Admin":
+            return [CRAGResult(answer="Master Admins cannot chat.", confidence=0.0) for _ in questions]
+        if not questions:
+            return []
+
+        print(f" [FYPService] User ({user.username}) asked a batch of {len(questions)} questions")
+        batch_start = time.time()
+        timings = {}
+
+        # Catalog questions skip retrieval entirely
+        is_catalog = [self._is_catalog_question(q) for q in questions]
+        rag_idx = [i for i, flag in enumerate(is_catalog) if not flag]
+        rag_questions = [questions[i] for i in rag_idx]
+
+        # 1. EMBED + RETRIEVE (one batch each)
+        candidates = [[] for _ in rag_questions]
+        retrieval_error = ""
+        if rag_questions:
+            try:
+                t0 = time.time()
+                embeddings = model_db.embed_queries(rag_questions)
+                timings["embed_batch"] = time.time() - t0
+
+                t0 = time.time()
+                candidates = model_db.batch_search(
+                    self.collection_name, embeddings, [user.username] * len(rag_questions), top_k=10
+                )
+                timings["search_batch"] = time.time() - t0
+            except Exception as e:
+                # Surfaced on each result: answering from memory would hide that search never ran
+                print(f"   -> ⚠️ Batch Retrieval Error: {e}")
+                retrieval_error = f"Batch retrieval failed: {e}"
+
+        # 2. RERANK (one cross-encoder pass over every (query, node) pair)
+        t0 = time.time()
+        reranked = [[] for _ in questions]
+        for i, nodes in zip(rag_idx, self._rerank_batch(rag_questions, candidates)):
+            reranked[i] = nodes
+        timings["rerank_batch"] = time.time() - t0
+
+        # 3. GENERATE (bounded concurrency)
+        def generate(i):
+            t_gen = time.time()
+            if is_catalog[i]:
+                result = CRAGResult(answer=self._answer_from_catalog(user), confidence=1.0)
+            elif retrieval_error:
+                result = CRAGResult(answer=f"[Error: {retrieval_error}]", error=retrieval_error)
+            else:
+                result = self._generate_answer(questions[i], reranked[i], user)
+            result.timings = dict(timings)
+            result.timings["generate"] = time.time() - t_gen
+            result.timings["total"] = time.time() - batch_start
+            return result
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+            results = list(pool.map(generate, range(len(questions))))
+
+        print(f"   -> ✅ Batch done in {time.time() - batch_start:.2f}s")
+        return results
+
+    def _rerank_batch(self, queries, candidates):
+        """Scores all (query, node) pairs in a single cross-encoder call, then splits per query."""
+        # Mirrors answer(): without a reranker we don't trust raw vector hits
+        if not self.reranker:
+            return [[] for _ in queries]
+
+        pairs, owners, flat_nodes = [], [], []
+        for qi, (query, nodes) in enumerate(zip(queries, candidates)):
+            for n in nodes:
+                pairs.append((query, n.node.get_content(metadata_mode=MetadataMode.EMBED)))
+                owners.append(qi)
+                flat_nodes.append(n)
+
+        results = [[] for _ in queries]
+        if not pairs:
+            return results
+
+        try:
+            scores = inference_backends.score_pairs(self.reranker, pairs)
+        except TypeError as e:
+            # This reranker can't score arbitrary pairs: rerank query by query instead
+            print(f"   -> ⚠️ {e}; reranking query by query")
+            return [
+                self._collapse_duplicates(
+                    [n for n in self.reranker.postprocess_nodes(nodes, query_str=query) if n.score > 0.0]
+                ) if nodes else []
+                for query, nodes in zip(queries, candidates)
+            ]
+        except Exception as e:
+            print(f"   -> ⚠️ Batch Rerank Error: {e}")
+            return results
+
+        for qi, n, score in zip(owners, flat_nodes, scores):
+            results[qi].append(NodeWithScore(node=n.node, score=float(score)))
+
+        top_n = self.reranker.top_n
+        return [
+            self._collapse_duplicates(
+                [n for n in sorted(nodes, key=lambda x: x.score, reverse=True)[:top_n] if n.score > 0.0]
+            )
+            for nodes in results
+        ]
+
+    def _generate_answer(self, question, nodes, user) -> CRAGResult:
+        """Non-streaming version of the two answer() branches, used by answer_batch."""
+        try:
+            if nodes:
+                synthesizer = get_response_synthesizer(
+                    response_mode="tree_summarize",
+                    llm=self.llm,
+                    text_qa_template=self._get_prompt_for_role(user.role)
+                )
+                response = synthesizer.synthesize(question, nodes=self._expand_to_parents(nodes))
+                return CRAGResult(
+                    answer=str(response),
+                    source_nodes=self._build_sources(nodes),
+                    confidence=self._confidence(nodes)
+                )
+            return self._answer_from_memory(question, history=None)
+        except Exception as e:
+            return self._fallback(question, str(e))
+
+    def _is_catalog_question(self, question: str) -> bool:
+        return bool(CATALOG_QUESTION_PATTERN.search(question))
+
+    def list_documents(self, user) -> List[DocumentInfo]:
+        """Documents this user may see, newest first (from the catalog, no vector search)."""
+        if user.role == "Master Admin":
+            return []
+        return model_db.get_catalog(user.username, self.collection_name)
+
+    def _answer_from_catalog(self, user) -> str:
+        """Lists the documents visible to this user, straight from the catalog."""
+        docs = self.list_documents(user)
+        if not docs:
+            return "No documents have been uploaded that you can access yet."
+
+        lines = [f"I have {len(docs)} document(s) available to you:"]
+        for d in docs:
+            lines.append(
+                f"- {d.file_name} ({d.visibility}, owner: {d.owner}, "
+                f"{d.chunk_count} chunks, {d.size_bytes / 1024:.1f} KB, uploaded {d.uploaded_at})"
+            )
+        return "\n".join(lines)
+
+    def _collapse_duplicates(self, nodes):
+        """
+        Groups hits by canonical chunk: identical chunks (e.g. indexed before dedup
+        existed) are kept once, with the file references of all copies merged.
+        Expects nodes sorted by score, so the best-scoring copy is kept.
+        """
+        kept = {}
+        for n in nodes:
+            refs = n.metadata.get('file_refs') or [n.metadata.get('file_name', 'unknown')]
+            key = dedup.content_key(n.node.get_content())
+            if key not in kept:
+                n.metadata['file_refs'] = list(refs)
+                kept[key] = n
+            else:
+                merged = kept[key].metadata['file_refs']
+                merged.extend(r for r in refs if r not in merged)
+        return list(kept.values())
+
+    def _expand_to_parents(self, nodes, budget: int = PARENT_CONTEXT_BUDGET):
+        """
+        Swaps child chunks for their parent section (best hit first) while the
+        context fits in the budget. Siblings of an expanded parent are dropped;
+        hits without a parent, or whose parent doesn't fit, stay as they are.
+        Only the parents of these final hits are fetched from the parent store.
+        """
+        parent_ids = [n.metadata.get("parent_id") for n in nodes]
+        if not any(parent_ids):
+            return nodes
+        try:
+            parent_texts = model_db.get_parent_texts(parent_ids)
+        except Exception as e:
+            print(f"   -> ⚠️ Parent Store Error: {e}")
+            return nodes
+
+        expanded, seen_parents, used = [], set(), 0
+        for n, parent_id in zip(nodes, parent_ids):
+            parent_text = parent_texts.get(parent_id)
+
+            if parent_id in seen_parents:
+                continue
+            parent_tokens = _count_tokens(parent_text) if parent_text else 0
+            if parent_text and used + parent_tokens <= budget:
+                parent = TextNode(
+                    id_=parent_id,
+                    text=parent_text,
+                    metadata=dict(n.metadata),
+                    excluded_embed_metadata_keys=list(n.node.excluded_embed_metadata_keys),
+                    excluded_llm_metadata_keys=list(n.node.excluded_llm_metadata_keys),
+                )
+                expanded.append(NodeWithScore(node=parent, score=n.score))
+                seen_parents.add(parent_id)
+                used += parent_tokens
+            else:
+                expanded.append(n)
+                used += _count_tokens(n.node.get_content())
+        return expanded
+
+    def _build_sources(self, nodes) -> List[SourceNode]:
+        return [
+            SourceNode(
+                file_name=n.metadata.get('file_name', 'unknown'),
+                content_snippet=n.node.get_content()[:200] + "...",
+                score=float(n.score) if n.score else 0.0,
+                file_refs=n.metadata.get('file_refs') or [n.metadata.get('file_name', 'unknown')]
+            ) for n in nodes
+        ]
+
+    def _confidence(self, nodes) -> float:
+        return 1 / (1 + 2.718 ** (-nodes[0].score))
+
     def _answer_from_memory(self, question, history):
         """Generates an answer using ONLY the chat history (No RAG)."""
         try:
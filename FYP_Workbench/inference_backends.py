@@ -0,0 +1,379 @@
+# FYP_Workbench/inference_backends.py
+"""
+Selectable CPU inference backends for the embedding model and the reranker.
+
+    FYP_INFERENCE_BACKEND = torch      (default) HuggingFaceEmbedding + SentenceTransformerRerank
+                          = onnx       ONNX Runtime, fp32 graph
+                          = onnx-int8  ONNX Runtime, dynamically int8-quantized graph
+    FYP_INFERENCE_THREADS = N          ONNX Runtime intra-op threads (0 = let ORT decide)
+
+The ONNX backends only need `onnxruntime` + `tokenizers` at runtime (no torch).
+The graphs are built once from the locally cached HuggingFace weights:
+
+    pip install -r FYP_Workbench/requirements-onnx-build.txt   # optimum (+ torch), build only
+    python FYP_Workbench/inference_backends.py build    # export + quantize
+    python FYP_Workbench/inference_backends.py verify   # accuracy vs torch + RAM/latency per backend
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, List, Optional
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+
+EMBED_MODEL = "BAAI/bge-small-en-v1.5"
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Same instruction HuggingFaceEmbedding prepends to queries for bge models
+BGE_QUERY_INSTRUCTION = "Represent this question for searching relevant passages: "
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ONNX_DIR = os.path.join(BASE_DIR, "onnx_models")
+
+
+def _backend():
+    backend = os.environ.get("FYP_INFERENCE_BACKEND", "torch").lower()
+    if backend not in BACKENDS:
+        print(f"⚠️ Unknown inference backend '{backend}', using torch")
+        return "torch"
+    return backend
+
+
+def _threads():
+    return int(os.environ.get("FYP_INFERENCE_THREADS", "0"))
+
+
+def _model_dir(model_name):
+    return os.path.join(ONNX_DIR, model_name.replace("/", "__"))
+
+
+# --- ONNX RUNTIME WRAPPER ---
+class OnnxModel:
+    """A tokenizer + ONNX Runtime session for one exported transformer."""
+
+    def __init__(self, model_name, quantized=False, threads=0, max_length=512):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_dir = _model_dir(model_name)
+        graph = os.path.join(model_dir, "model_quantized.onnx" if quantized else "model.onnx")
+        if not os.path.exists(graph):
+            raise FileNotFoundError(
+                f"{graph} not found. Run: python FYP_Workbench/inference_backends.py build"
+            )
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(graph, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+    def run(self, inputs):
+        """inputs: list of texts, or list of (text_a, text_b) pairs. Returns the first graph output."""
+        import numpy as np
+
+        encodings = self.tokenizer.encode_batch(list(inputs))
+        feed = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        return self.session.run(None, feed)[0]
+
+
+# --- EMBEDDING ---
+class OnnxEmbedding(BaseEmbedding):
+    """bge-small on ONNX Runtime: CLS pooling + L2 normalization, like the torch model."""
+
+    quantized: bool = Field(default=False)
+    threads: int = Field(default=0)
+    _model: OnnxModel = PrivateAttr()
+
+    def __init__(self, model_name=EMBED_MODEL, quantized=False, threads=0, **kwargs: Any):
+        super().__init__(model_name=model_name, quantized=quantized, threads=threads, **kwargs)
+        self._model = OnnxModel(model_name, quantized=quantized, threads=threads)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "OnnxEmbedding"
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        import numpy as np
+
+        hidden = self._model.run(texts)
+        cls = hidden[:, 0]
+        cls = cls / np.linalg.norm(cls, axis=1, keepdims=True)
+        return cls.tolist()
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([BGE_QUERY_INSTRUCTION + query])[0]
+
+    def _get_query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        return self._embed([BGE_QUERY_INSTRUCTION + q for q in queries])
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+
+# --- RERANKER ---
+class OnnxCrossEncoder:
+    """Same predict() contract as sentence_transformers.CrossEncoder (raw logits for ms-marco)."""
+
+    def __init__(self, model_name=RERANK_MODEL, quantized=False, threads=0):
+        self._model = OnnxModel(model_name, quantized=quantized, threads=threads)
+
+    def predict(self, pairs, batch_size=32):
+        import numpy as np
+
+        scores = [
+            self._model.run(pairs[i:i + batch_size])[:, 0]
+            for i in range(0, len(pairs), batch_size)
+        ]
+        return np.concatenate(scores) if scores else np.array([])
+
+
+class OnnxRerank(BaseNodePostprocessor):
+    """Drop-in for SentenceTransformerRerank backed by OnnxCrossEncoder."""
+
+    model: str = Field(default=RERANK_MODEL)
+    top_n: int = Field(default=2)
+    _model: OnnxCrossEncoder = PrivateAttr()
+
+    def __init__(self, model=RERANK_MODEL, top_n=2, quantized=False, threads=0, **kwargs: Any):
+        super().__init__(model=model, top_n=top_n, **kwargs)
+        self._model = OnnxCrossEncoder(model, quantized=quantized, threads=threads)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "OnnxRerank"
+
+    def predict(self, pairs):
+        """Raw cross-encoder scores for (query, passage) pairs."""
+        return self._model.predict(pairs)
+
+    def _postprocess_nodes(
+        self, nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None
+    ) -> List[NodeWithScore]:
+        if query_bundle is None:
+            raise ValueError("Missing query bundle in extra info.")
+        if not nodes:
+            return []
+
+        pairs = [(query_bundle.query_str, n.node.get_content(metadata_mode=MetadataMode.EMBED)) for n in nodes]
+        for n, score in zip(nodes, self._model.predict(pairs)):
+            n.score = float(score)
+        return sorted(nodes, key=lambda x: x.score, reverse=True)[:self.top_n]
+
+
+# --- FACTORIES (used by model_db and FYPService) ---
+def get_embed_model(backend=None):
+    backend = backend or _backend()
+    if backend != "torch":
+        try:
+            return OnnxEmbedding(quantized=(backend == "onnx-int8"), threads=_threads())
+        except Exception as e:
+            print(f"⚠️ ONNX embedding unavailable ({e}), falling back to torch")
+
+    from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+    return HuggingFaceEmbedding(model_name=EMBED_MODEL)
+
+
+def get_reranker(top_n=3, backend=None):
+    backend = backend or _backend()
+    if backend != "torch":
+        try:
+            return OnnxRerank(top_n=top_n, quantized=(backend == "onnx-int8"), threads=_threads())
+        except Exception as e:
+            print(f"⚠️ ONNX reranker unavailable ({e}), falling back to torch")
+
+    from llama_index.core.postprocessor import SentenceTransformerRerank
+    return SentenceTransformerRerank(model=RERANK_MODEL, top_n=top_n)
+
+
+def score_pairs(reranker, pairs):
+    """
+    Scores (query, passage) pairs in one call with either backend's reranker.
+    Raises TypeError if the reranker has no batch scoring entry point.
+    """
+    # OnnxRerank (and any reranker with the same public entry point)
+    if callable(getattr(reranker, "predict", None)):
+        return reranker.predict(pairs)
+
+    # SentenceTransformerRerank keeps its sentence_transformers.CrossEncoder in _model
+    cross_encoder = getattr(reranker, "_model", None)
+    if cross_encoder is None or not hasattr(cross_encoder, "predict"):
+        raise TypeError(f"{type(reranker).__name__} does not support batch pair scoring")
+    return cross_encoder.predict(pairs)
+
+
+def embed_queries(embed_model, queries):
+    """
+    Embeds many queries in one model call with either backend's embedder
+    (query instruction applied, same vectors as get_query_embedding).
+    """
+    queries = list(queries)
+    if isinstance(embed_model, OnnxEmbedding):
+        return embed_model._get_query_embeddings(queries)
+
+    # HuggingFaceEmbedding keeps its SentenceTransformer (with a "query" prompt) in _model
+    sentence_model = getattr(embed_model, "_model", None)
+    if sentence_model is not None and "query" in getattr(sentence_model, "prompts", {}):
+        return sentence_model.encode(
+            queries,
+            batch_size=embed_model.embed_batch_size,
+            prompt_name="query",
+            normalize_embeddings=embed_model.normalize,
+        ).tolist()
+
+    # Any other BaseEmbedding: one public call per query
+    return [embed_model.get_query_embedding(q) for q in queries]
+
+
+# --- BUILD / VERIFY TOOLING ---
+def build():
+    """Exports both models to ONNX from the local HF cache and writes an int8 copy of each."""
+    from optimum.onnxruntime import (
+        ORTModelForFeatureExtraction, ORTModelForSequenceClassification, ORTQuantizer
+    )
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    for model_name, model_cls in [
+        (EMBED_MODEL, ORTModelForFeatureExtraction),
+        (RERANK_MODEL, ORTModelForSequenceClassification),
+    ]:
+        out_dir = _model_dir(model_name)
+        print(f" [Build] Exporting {model_name} -> {out_dir}")
+        model = model_cls.from_pretrained(model_name, export=True, local_files_only=True)
+        model.save_pretrained(out_dir)
+        AutoTokenizer.from_pretrained(model_name, local_files_only=True).save_pretrained(out_dir)
+
+        print(f" [Build] Quantizing {model_name} (dynamic int8)")
+        quantizer = ORTQuantizer.from_pretrained(out_dir)
+        quantizer.quantize(
+            save_dir=out_dir,
+            quantization_config=AutoQuantizationConfig.avx2(is_static=False, per_channel=False),
+        )
+    print("✅ Build complete")
+
+
+SAMPLE_QUERIES = [
+    "How many days do customers have to return an item?",
+    "Who can upload global documents?",
+    "What is the password policy for staff accounts?",
+]
+SAMPLE_PASSAGES = [
+    "Our refund policy allows returns within 30 days of purchase with a receipt.",
+    "Only Admins can upload Global documents, which are visible to every user.",
+    "Staff passwords must be at least 12 characters and rotated every 90 days.",
+    "The cafeteria is open from 8am to 3pm on weekdays.",
+    "Master Admins manage user accounts but cannot chat or view documents.",
+]
+
+
+def bench(backend, rounds=20):
+    """Measures load time, peak RSS and per-query latency of one backend (run in a fresh process)."""
+    import resource
+
+    t0 = time.time()
+    embed_model = get_embed_model(backend)
+    reranker = get_reranker(top_n=3, backend=backend)
+    load_s = time.time() - t0
+
+    pairs = [(q, p) for q in SAMPLE_QUERIES[:1] for p in SAMPLE_PASSAGES * 2]  # 10 pairs, like top_k=10
+    embed_model.get_query_embedding(SAMPLE_QUERIES[0])  # warm-up
+    score_pairs(reranker, pairs)
+
+    t0 = time.time()
+    for i in range(rounds):
+        embed_model.get_query_embedding(SAMPLE_QUERIES[i % len(SAMPLE_QUERIES)])
+    embed_ms = (time.time() - t0) / rounds * 1000
+
+    t0 = time.time()
+    for _ in range(rounds):
+        score_pairs(reranker, pairs)
+    rerank_ms = (time.time() - t0) / rounds * 1000
+
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    return {"backend": backend, "load_s": load_s, "rss_mb": rss_mb,
+            "embed_ms": embed_ms, "rerank_10_ms": rerank_ms,
+            "torch_loaded": "torch" in sys.modules}
+
+
+def verify():
+    """Compares each ONNX backend to torch, then benchmarks every backend in its own process."""
+    import numpy as np
+
+    torch_embed = get_embed_model("torch")
+    ref_embed = np.array(embed_queries(torch_embed, SAMPLE_QUERIES))
+    ref_passages = np.array(torch_embed.get_text_embedding_batch(SAMPLE_PASSAGES))
+    pairs = [(q, p) for q in SAMPLE_QUERIES for p in SAMPLE_PASSAGES]
+    ref_scores = np.array(score_pairs(get_reranker(backend="torch"), pairs))
+
+    print("\n--- ACCURACY vs torch ---")
+    for backend in BACKENDS[1:]:
+        try:
+            embed_model = OnnxEmbedding(quantized=(backend == "onnx-int8"), threads=_threads())
+            cross_encoder = OnnxCrossEncoder(quantized=(backend == "onnx-int8"), threads=_threads())
+        except Exception as e:
+            print(f"{backend:>10}: skipped ({e})")
+            continue
+
+        q = np.array(embed_queries(embed_model, SAMPLE_QUERIES))
+        p = np.array(embed_model.get_text_embedding_batch(SAMPLE_PASSAGES))
+        cos = np.concatenate([(q * ref_embed).sum(axis=1), (p * ref_passages).sum(axis=1)])
+
+        scores = np.array(cross_encoder.predict(pairs))
+        n = len(SAMPLE_PASSAGES)
+        top1 = np.mean([
+            np.argmax(scores[i * n:(i + 1) * n]) == np.argmax(ref_scores[i * n:(i + 1) * n])
+            for i in range(len(SAMPLE_QUERIES))
+        ])
+        print(f"{backend:>10}: embedding cosine min {cos.min():.4f} mean {cos.mean():.4f} | "
+              f"rerank max |Δlogit| {np.abs(scores - ref_scores).max():.3f}, top-1 agreement {top1:.0%}")
+
+    print("\n--- RESOURCES (fresh process per backend) ---")
+    for backend in BACKENDS:
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "bench", backend],
+            capture_output=True, text=True,
+        )
+        try:
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            print(f"{backend:>10}: bench failed\n{out.stderr[-500:]}")
+            continue
+        print(f"{backend:>10}: load {r['load_s']:.1f}s | peak RSS {r['rss_mb']:.0f} MB | "
+              f"query embed {r['embed_ms']:.1f} ms | rerank x10 {r['rerank_10_ms']:.1f} ms | "
+              f"torch loaded: {r['torch_loaded']}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    if command == "build":
+        build()
+    elif command == "bench":
+        print(json.dumps(bench(sys.argv[2] if len(sys.argv) > 2 else _backend())))
+    else:
+        verify()
@@ -0,0 +1,305 @@
+# FYP_Workbench/load_test.py
+"""
+Concurrent user load simulator.
+
+Starts N simulated users (each with its own ChatViewModel), logs them in, replays a
+scripted conversation (questions + uploads) and consumes the streaming generator at
+a human reading speed. Reports throughput, time-to-first-token (TTFT) and total
+latency percentiles for every concurrency level, so we can see how they degrade.
+
+Local stand-ins (no Docker / Ollama needed):
+    python FYP_Workbench/load_test.py --local --users 1,4,8 --token-rate 20
+
+Against the real services (Qdrant on QDRANT_URL, Ollama running):
+    python FYP_Workbench/load_test.py --users 1,2,4
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, List
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Default conversation replayed by every simulated user
+DEFAULT_SCRIPT = [
+    {"upload": "Our refund policy allows returns within 30 days of purchase with a receipt. "
+               "Staff must log every refund in the finance portal before the end of the day."},
+    {"say": "Hello, who are you?"},
+    {"say": "What documents do you have?"},
+    {"say": "How many days do customers have to return an item?"},
+    {"say": "Where do staff log it?"},
+]
+
+
+def make_fake_llm(tokens_per_sec, reply):
+    """Builds an Ollama stand-in that streams `reply` word by word at a fixed token rate."""
+    from llama_index.core.llms import CustomLLM, CompletionResponse, LLMMetadata
+    from llama_index.core.llms.callbacks import llm_completion_callback
+
+    class FakeOllama(CustomLLM):
+        tokens_per_sec: float = 20.0
+        reply: str = ""
+
+        @property
+        def metadata(self) -> LLMMetadata:
+            return LLMMetadata(context_window=2048, num_output=256, model_name="fake-tinyllama")
+
+        def _tokens(self):
+            words = self.reply.split(" ")
+            return [w if i == 0 else " " + w for i, w in enumerate(words)]
+
+        @llm_completion_callback()
+        def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+            tokens = self._tokens()
+            time.sleep(len(tokens) / self.tokens_per_sec)
+            return CompletionResponse(text="".join(tokens))
+
+        @llm_completion_callback()
+        def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any):
+            text = ""
+            for token in self._tokens():
+                time.sleep(1 / self.tokens_per_sec)
+                text += token
+                yield CompletionResponse(text=text, delta=token)
+
+    return FakeOllama(tokens_per_sec=tokens_per_sec, reply=reply)
+
+
+@dataclass
+class TurnStats:
+    ttft: float  # seconds until the first answer character reached the "reader"
+    total: float  # seconds until the stream was fully consumed
+    chars: int
+    error: bool = False
+
+
+@dataclass
+class UserRun:
+    turns: List[TurnStats] = field(default_factory=list)
+    uploads: List[float] = field(default_factory=list)
+    failures: List[str] = field(default_factory=list)
+
+
+def consume_stream(generator, read_chars_per_sec):
+    """Pulls the ViewModel stream like a UI would, pausing to 'read' each new chunk."""
+    start = time.time()
+    ttft = None
+    printed = 0
+    content = ""
+
+    for msg in generator:
+        if msg.role == "user":
+            continue
+        content = msg.content
+        if len(content) > printed:
+            if ttft is None:
+                ttft = time.time() - start
+            if read_chars_per_sec > 0:
+                time.sleep((len(content) - printed) / read_chars_per_sec)
+            printed = len(content)
+
+    total = time.time() - start
+    return TurnStats(
+        ttft=ttft if ttft is not None else total,
+        total=total,
+        chars=len(content),
+        error=content.startswith("[Error") or ttft is None,
+    )
+
+
+def simulate_user(username, password, script, args, fake_llm, upload_dir, collection_name, start_barrier,
+                  run: UserRun):
+    from view_model import ChatViewModel
+
+    try:
+        vm = ChatViewModel()
+        vm._service.collection_name = collection_name
+        if fake_llm is not None:
+            vm._service.llm = fake_llm
+
+        if not vm.login(username, password):
+            run.failures.append(f"{username}: login failed")
+            start_barrier.abort()
+            return
+    except Exception as e:
+        run.failures.append(f"{username}: setup failed ({e})")
+        start_barrier.abort()
+        return
+
+    try:
+        start_barrier.wait()
+    except threading.BrokenBarrierError:
+        return
+
+    for step_no, step in enumerate(script):
+        try:
+            if "upload" in step:
+                path = os.path.join(upload_dir, f"{username}_{step_no}.txt")
+                with open(path, "w") as f:
+                    f.write(step["upload"])
+                t0 = time.time()
+                vm.upload_document(path, is_global=step.get("global", False))
+                run.uploads.append(time.time() - t0)
+            elif "say" in step:
+                run.turns.append(consume_stream(vm.send_message(step["say"]), args.read_speed))
+                time.sleep(args.think_time)
+        except Exception as e:
+            run.failures.append(f"{username}: step {step_no} failed ({e})")
+
+    vm.logout()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile (values need not be sorted)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def run_level(level, script, args, fake_llm, upload_dir, collection_name):
+    from user_manager import UserManager
+
+    # Provision this level's users up front, in one write (one account per simulated user)
+    accounts = [(f"load_c{level}_u{i}", "pass") for i in range(level)]
+    UserManager().bulk_import(
+        "Master Admin",
+        [{"username": username, "password": password, "role": "Admin"} for username, password in accounts],
+    )
+
+    runs = [UserRun() for _ in accounts]
+    barrier = threading.Barrier(level + 1)
+    threads = [
+        threading.Thread(
+            target=simulate_user,
+            args=(username, password, script, args, fake_llm, upload_dir, collection_name, barrier, run),
+            daemon=True,
+        )
+        for (username, password), run in zip(accounts, runs)
+    ]
+    for t in threads:
+        t.start()
+
+    # Start the clock only once every ChatViewModel has finished loading models
+    try:
+        barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    start = time.time()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+
+    turns = [t for r in runs for t in r.turns]
+    ok = [t for t in turns if not t.error]
+    return {
+        "users": level,
+        "turns": len(turns),
+        "errors": len(turns) - len(ok) + sum(len(r.failures) for r in runs),
+        "elapsed": elapsed,
+        "throughput": len(ok) / elapsed if elapsed else 0.0,
+        "chars_per_sec": sum(t.chars for t in ok) / elapsed if elapsed else 0.0,
+        "ttft": [t.ttft for t in ok],
+        "total": [t.total for t in ok],
+        "uploads": [u for r in runs for u in r.uploads],
+        "failures": [f for r in runs for f in r.failures],
+    }
+
+
+def print_report(results):
+    print("\n" + "=" * 96)
+    print(f"{'users':>5} | {'turns':>5} | {'err':>3} | {'turns/s':>7} | {'chars/s':>8} | "
+          f"{'TTFT p50':>8} {'p95':>6} {'p99':>6} | {'total p50':>9} {'p95':>6} {'p99':>6}")
+    print("-" * 96)
+    for r in results:
+        print(f"{r['users']:>5} | {r['turns']:>5} | {r['errors']:>3} | {r['throughput']:>7.2f} | "
+              f"{r['chars_per_sec']:>8.1f} | "
+              f"{percentile(r['ttft'], 50):>8.2f} {percentile(r['ttft'], 95):>6.2f} {percentile(r['ttft'], 99):>6.2f} | "
+              f"{percentile(r['total'], 50):>9.2f} {percentile(r['total'], 95):>6.2f} {percentile(r['total'], 99):>6.2f}")
+    print("=" * 96)
+
+    # Degradation relative to the lowest concurrency level
+    base = results[0]
+    base_ttft = percentile(base["ttft"], 95) or 1e-9
+    base_total = percentile(base["total"], 95) or 1e-9
+    for r in results[1:]:
+        print(f" {r['users']:>3} users: TTFT p95 x{percentile(r['ttft'], 95) / base_ttft:.2f}, "
+              f"total p95 x{percentile(r['total'], 95) / base_total:.2f}, "
+              f"throughput x{r['throughput'] / (base['throughput'] or 1e-9):.2f} vs {base['users']} user(s)")
+
+    for r in results:
+        if r["uploads"]:
+            print(f" {r['users']:>3} users: upload p50 {percentile(r['uploads'], 50):.2f}s, "
+                  f"p95 {percentile(r['uploads'], 95):.2f}s")
+        for failure in r["failures"]:
+            print(f"   ⚠️ {failure}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent user load simulator")
+    parser.add_argument("--users", default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--script", help="JSON file with a list of {'say': ...} / {'upload': ...} steps")
+    parser.add_argument("--local", action="store_true",
+                        help="Use local stand-ins: fake Ollama + qdrant-client in-memory mode")
+    parser.add_argument("--token-rate", type=float, default=20.0, help="Fake Ollama tokens per second")
+    parser.add_argument("--read-speed", type=float, default=40.0,
+                        help="Reader speed in characters per second (0 = consume as fast as possible)")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Seconds between a user's turns")
+    args = parser.parse_args()
+
+    levels = [int(x) for x in args.users.split(",") if x.strip()]
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script, "r") as f:
+            script = json.load(f)
+
+    # Keep load-test accounts, histories, catalog, dedup index, parents and chunks out of the real stores
+    collection_name = f"load_test_{int(time.time())}"
+    scratch = tempfile.mkdtemp(prefix="fyp_load_")
+    if args.local:
+        os.environ.setdefault("QDRANT_PATH", ":memory:")
+
+    import user_manager
+    import history_manager
+    import model_db
+    user_manager.USER_DB_FILE = os.path.join(scratch, "users_db.json")
+    history_manager.HISTORY_DIR = os.path.join(scratch, "chat_histories")
+    model_db.CATALOG_FILE = os.path.join(scratch, "doc_catalog.json")
+    model_db.DEDUP_FILE = os.path.join(scratch, "dedup_index.db")
+    model_db.PARENT_STORE_FILE = os.path.join(scratch, "parent_store.db")
+
+    fake_llm = None
+    if args.local:
+        fake_llm = make_fake_llm(
+            args.token_rate,
+            "This is a simulated answer from the local stand-in model. It streams at a fixed "
+            "token rate so that we can measure the pipeline around the LLM.",
+        )
+
+    print(f"--- LOAD TEST ({'local stand-ins' if args.local else 'real services'}) ---")
+    print(f"Levels: {levels} | Script steps: {len(script)} | Scratch dir: {scratch} | "
+          f"Collection: {collection_name}")
+
+    # Create the shared client before any user thread starts
+    client = model_db.get_client()
+    results = []
+    try:
+        for level in levels:
+            print(f"\n>> Running {level} concurrent user(s)...")
+            results.append(run_level(level, script, args, fake_llm, scratch, collection_name))
+    finally:
+        if client and client.collection_exists(collection_name):
+            client.delete_collection(collection_name)
+            print(f"\n🧹 Deleted collection '{collection_name}'")
+
+    print_report(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,77 @@
 # FYP_Workbench/model_db.py
 import os
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import asdict
+from datetime import datetime
 import qdrant_client
 from llama_index.core import VectorStoreIndex, StorageContext, SimpleDirectoryReader, Settings
+from llama_index.core.node_parser import SentenceSplitter
 from llama_index.vector_stores.qdrant import QdrantVectorStore
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
 from llama_index.core.vector_stores import MetadataFilters, MetadataFilter, FilterCondition
+from llama_index.core.vector_stores.utils import metadata_dict_to_node
+from llama_index.core.schema import NodeWithScore
+from qdrant_client.http import models as rest
+
+from data_types import DocumentInfo
+import dedup
+import file_utils
+import inference_backends
 
 # CONFIGURATION
-Settings.embed_model = HuggingFaceEmbedding(model_name="BAAI/bge-small-en-v1.5")
-QDRANT_URL = "http://127.0.0.1:6333"
+# Embedding backend is picked by FYP_INFERENCE_BACKEND (torch / onnx / onnx-int8)
+Settings.embed_model = inference_backends.get_embed_model()
+QDRANT_URL = os.environ.get("QDRANT_URL", "http://127.0.0.1:6333")
+# Set QDRANT_PATH (a folder or ":memory:") to use qdrant-client local mode instead of the server
+QDRANT_PATH = os.environ.get("QDRANT_PATH")
+
+# Chunking strategy: 'default' (LlamaIndex's node parser) or 'parent_child'
+# (small child chunks are embedded/reranked, each linked to its parent section)
+CHUNKING_STRATEGIES = ("default", "parent_child")
+
+
+def _chunking_strategy():
+    strategy = os.environ.get("FYP_CHUNKING", "default").lower()
+    if strategy not in CHUNKING_STRATEGIES:
+        print(f"⚠️ Unknown chunking strategy '{strategy}', using default")
+        return "default"
+    return strategy
+
+
+CHUNKING_STRATEGY = _chunking_strategy()
+PARENT_CHUNK_SIZE = 384  # tokens, 3 fit in fyp_service.PARENT_CONTEXT_BUDGET
+CHILD_CHUNK_SIZE = 128
+CHILD_CHUNK_OVERLAP = 20
+
+# Catalog lives next to users_db.json, no matter where you run the terminal command.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CATALOG_FILE = os.path.join(BASE_DIR, "doc_catalog.json")
+DEDUP_FILE = os.path.join(BASE_DIR, "dedup_index.db")
+# Parent sections (parent_child chunking) are stored once here, keyed by parent_id
+PARENT_STORE_FILE = os.path.join(BASE_DIR, "parent_store.db")
+
+
+_client = None
+_client_lock = threading.Lock()
 
 
 def get_client():
-    try:
-        return qdrant_client.QdrantClient(url=QDRANT_URL)
-    except Exception:
-        return None
+    # One shared client per process (local mode locks its folder, so it can't be opened twice).
+    # Locked so concurrent first calls (e.g. one ChatViewModel per thread) don't each open one.
+    global _client
+    with _client_lock:
+        if _client is None:
+            try:
+                if QDRANT_PATH:
+                    _client = qdrant_client.QdrantClient(path=QDRANT_PATH)
+                else:
+                    _client = qdrant_client.QdrantClient(url=QDRANT_URL)
+            except Exception:
+                return None
+        return _client
 
 
 def get_index(collection_name):
@@ -47,16 +103,313 @@ def upload_file(file_path, collection_name, owner_username, visibility="private"
             doc.metadata["owner"] = owner_username
             doc.metadata["visibility"] = visibility
 
-            # Indexing
-        vector_store = QdrantVectorStore(client=client, collection_name=collection_name)
-        storage_context = StorageContext.from_defaults(vector_store=vector_store)
-        VectorStoreIndex.from_documents(documents, storage_context=storage_context)
+        # Chunking (done here so we know the chunk count for the catalog)
+        nodes, parents = _split_documents(documents)
+
+        # Dedup: decide and reserve canonical chunks in one short SQLite transaction,
+        # so two uploads (even from different workers) can't both claim the same chunk
+        index = dedup.DedupIndex(DEDUP_FILE)
+        unique_nodes, merged_refs = _dedup_nodes(
+            nodes, index, os.path.basename(file_path), dedup.scope_key(visibility, owner_username),
+            find_stored=lambda ids: _stored_point_ids(client, collection_name, ids),
+        )
 
-        return True, "Upload Successful"
+        # Indexing (embedding) runs outside any lock
+        try:
+            vector_store = QdrantVectorStore(client=client, collection_name=collection_name)
+            storage_context = StorageContext.from_defaults(vector_store=vector_store)
+            VectorStoreIndex(unique_nodes, storage_context=storage_context)
+        except Exception:
+            index.release(n.node_id for n in unique_nodes)
+            raise
+
+        # file_refs is read-modify-write on the canonical point: one upload at a time
+        with file_utils.file_lock(DEDUP_FILE):
+            _attach_file_refs(client, collection_name, merged_refs)
+
+        # Only the parents of chunks we actually stored are needed for expansion
+        stored_parent_ids = {n.metadata.get("parent_id") for n in unique_nodes}
+        _save_parents({pid: text for pid, text in parents.items() if pid in stored_parent_ids})
+
+        duplicates = len(nodes) - len(unique_nodes)
+        chunk_stats = _chunk_size_stats(nodes)
+        _record_upload(file_path, owner_username, visibility,
+                       chunk_count=len(unique_nodes), duplicate_chunks=duplicates, chunk_stats=chunk_stats)
+        ratio = duplicates / len(nodes) if nodes else 0.0
+        return True, (f"Upload Successful ({len(unique_nodes)} chunks indexed, "
+                      f"{duplicates} duplicates merged, dedup ratio {ratio:.0%}, "
+                      f"chunk size p50 {chunk_stats.get('p50', 0)} / max {chunk_stats.get('max', 0)} chars)")
     except Exception as e:
         return False, str(e)
 
 
+# --- CHUNKING ---
+def _split_documents(documents):
+    """
+    Splits documents into the nodes that get embedded, using CHUNKING_STRATEGY.
+    Returns (nodes, {parent_id: parent_text}); the dict is empty unless parent_child.
+    """
+    if CHUNKING_STRATEGY != "parent_child":
+        return Settings.node_parser.get_nodes_from_documents(documents), {}
+
+    parents = SentenceSplitter(chunk_size=PARENT_CHUNK_SIZE, chunk_overlap=0).get_nodes_from_documents(documents)
+    child_splitter = SentenceSplitter(chunk_size=CHILD_CHUNK_SIZE, chunk_overlap=CHILD_CHUNK_OVERLAP)
+
+    children, parent_texts = [], {}
+    for parent in parents:
+        parent_texts[parent.node_id] = parent.get_content()
+        for child in child_splitter.get_nodes_from_documents([parent]):
+            # Only the link is kept on the child; the text lives once in the parent store
+            child.metadata["parent_id"] = parent.node_id
+            for excluded in (child.excluded_embed_metadata_keys, child.excluded_llm_metadata_keys):
+                if "parent_id" not in excluded:
+                    excluded.append("parent_id")
+            children.append(child)
+    return children, parent_texts
+
+
+# --- PARENT STORE (parent_child chunking) ---
+def _parent_store():
+    conn = sqlite3.connect(PARENT_STORE_FILE, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS parents (parent_id TEXT PRIMARY KEY, text TEXT NOT NULL)")
+    return conn
+
+
+def _save_parents(parents):
+    if not parents:
+        return
+    with closing(_parent_store()) as conn, conn:
+        conn.executemany("INSERT OR REPLACE INTO parents (parent_id, text) VALUES (?, ?)", parents.items())
+
+
+def get_parent_texts(parent_ids):
+    """Returns {parent_id: text} for the given ids (missing ids are left out)."""
+    ids = list({pid for pid in parent_ids if pid})
+    if not ids or not os.path.exists(PARENT_STORE_FILE):
+        return {}
+    placeholders = ",".join("?" * len(ids))
+    with closing(_parent_store()) as conn:
+        rows = conn.execute(f"SELECT parent_id, text FROM parents WHERE parent_id IN ({placeholders})", ids)
+        return dict(rows.fetchall())
+
+
+def _chunk_size_stats(nodes):
+    """Distribution of chunk sizes (characters) for ingestion metrics."""
+    sizes = sorted(len(n.get_content()) for n in nodes)
+    if not sizes:
+        return {}
+
+    def percentile(pct):
+        return sizes[min(len(sizes) - 1, int(pct / 100 * len(sizes)))]
+
+    return {
+        "strategy": CHUNKING_STRATEGY,
+        "min": sizes[0],
+        "p50": percentile(50),
+        "p90": percentile(90),
+        "max": sizes[-1],
+        "mean": round(sum(sizes) / len(sizes)),
+    }
+
+
+# --- NEAR-DUPLICATE DETECTION ---
+def _dedup_nodes(nodes, index, file_name, scope, find_stored):
+    """
+    Splits freshly parsed nodes into the ones to store and the ones whose exact
+    text is already in Qdrant, reserving the new canonical chunks in the index.
+    find_stored(ids) returns the subset of ids present in Qdrant. A canonical chunk
+    that isn't there is either still being embedded by another upload (we store our
+    own copy, collapsed at retrieval) or, after dedup.RESERVATION_TTL, abandoned
+    (collection wiped, failed upload): then our chunk takes over its key.
+    Returns (unique_nodes, {canonical_node_id: {file_names}}).
+    """
+    unique_nodes, new_by_key, pending = [], {}, []
+
+    def keep(node, key, reserve=True):
+        node.metadata["file_refs"] = [file_name]
+        if reserve:
+            index.reserve(scope, key, node.node_id)
+        unique_nodes.append(node)
+        new_by_key[key] = node
+
+    with index.transaction():
+        for node in nodes:
+            # file_refs is bookkeeping; keep it out of the embedding and the prompt
+            for excluded in (node.excluded_embed_metadata_keys, node.excluded_llm_metadata_keys):
+                if "file_refs" not in excluded:
+                    excluded.append("file_refs")
+
+            key = dedup.content_key(node.get_content())
+            if key in new_by_key:
+                continue  # same text twice in this upload
+            canonical = index.find(scope, key)
+            if canonical is None:
+                keep(node, key)
+            else:
+                pending.append((node, key, canonical))
+
+        # One existence check for every canonical chunk we'd merge into
+        stored = find_stored({node_id for _, _, (node_id, _) in pending}) if pending else set()
+        merged_refs = {}
+        for node, key, (canonical_id, reserved_at) in pending:
+            if key in new_by_key:
+                continue
+            if canonical_id in stored:
+                merged_refs.setdefault(canonical_id, set()).add(file_name)
+            else:
+                abandoned = time.time() - reserved_at > dedup.RESERVATION_TTL
+                keep(node, key, reserve=abandoned)
+
+    return unique_nodes, merged_refs
+
+
+def _stored_point_ids(client, collection_name, ids):
+    """Subset of ids (as strings) that exist as points in the collection."""
+    if not client.collection_exists(collection_name):
+        return set()
+    points = client.retrieve(collection_name, ids=list(ids), with_payload=False, with_vectors=False)
+    return {str(point.id) for point in points}
+
+
+def _attach_file_refs(client, collection_name, merged_refs):
+    """Adds file names to the 'file_refs' of canonical chunks already stored in Qdrant."""
+    if not merged_refs:
+        return
+
+    points = client.retrieve(collection_name, ids=list(merged_refs.keys()), with_payload=True)
+    for point in points:
+        payload = point.payload
+        refs = payload.get("file_refs") or [payload.get("file_name", "unknown")]
+        refs = refs + sorted(merged_refs[str(point.id)] - set(refs))
+
+        # LlamaIndex rebuilds nodes from '_node_content', so update the metadata there too
+        node_content = json.loads(payload["_node_content"])
+        node_content.setdefault("metadata", {})["file_refs"] = refs
+        client.set_payload(
+            collection_name=collection_name,
+            payload={"file_refs": refs, "_node_content": json.dumps(node_content)},
+            points=[point.id],
+        )
+
+
+def get_ingestion_stats():
+    """Totals over the whole catalog: stored chunks, merged duplicates and the dedup ratio."""
+    # Writers replace the file atomically, so a plain read is always consistent
+    catalog = _load_catalog()
+
+    stored = sum(e["chunk_count"] for e in catalog.values())
+    duplicates = sum(e.get("duplicate_chunks", 0) for e in catalog.values())
+    total = stored + duplicates
+    return {
+        "files": len(catalog),
+        "stored_chunks": stored,
+        "duplicate_chunks": duplicates,
+        "dedup_ratio": duplicates / total if total else 0.0,
+    }
+
+
+# --- DOCUMENT CATALOG ---
+def _load_catalog():
+    if not os.path.exists(CATALOG_FILE):
+        return {}
+    try:
+        with open(CATALOG_FILE, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error loading catalog: {e}")
+        return {}
+
+
+def _record_upload(file_path, owner_username, visibility, chunk_count, duplicate_chunks=0, chunk_stats=None):
+    """Adds (or refreshes) the catalog entry of an uploaded file."""
+    file_name = os.path.basename(file_path)
+    # Private files are keyed per owner, so two users can upload the same name
+    key = f"global/{file_name}" if visibility == "global" else f"{owner_username}/{file_name}"
+
+    with file_utils.file_lock(CATALOG_FILE):
+        catalog = _load_catalog()
+        previous = catalog.get(key)
+        entry = DocumentInfo(
+            file_name=file_name,
+            owner=owner_username,
+            visibility=visibility,
+            # Re-uploads add new chunks to Qdrant, so the count accumulates too
+            chunk_count=chunk_count + (previous["chunk_count"] if previous else 0),
+            duplicate_chunks=duplicate_chunks + (previous.get("duplicate_chunks", 0) if previous else 0),
+            size_bytes=os.path.getsize(file_path),
+            uploaded_at=datetime.now().isoformat(timespec="seconds"),
+            chunk_stats=chunk_stats or {},
+        )
+        catalog[key] = asdict(entry)
+        file_utils.atomic_write_json(CATALOG_FILE, catalog, indent=4)
+
+
+def _backfill_catalog(collection_name):
+    """
+    Builds the catalog from the chunk payloads already in Qdrant, for deployments
+    that indexed documents before the catalog existed. Upload times and duplicate
+    counts weren't recorded back then, so the file dates stand in / stay 0.
+    """
+    client = get_client()
+    if not client or not client.collection_exists(collection_name):
+        return
+
+    with file_utils.file_lock(CATALOG_FILE):
+        if os.path.exists(CATALOG_FILE):  # another worker got here first
+            return
+
+        catalog = {}
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name, limit=256, offset=offset, with_payload=True, with_vectors=False
+            )
+            for point in points:
+                payload = point.payload or {}
+                file_name = payload.get("file_name")
+                if not file_name:
+                    continue
+                owner = payload.get("owner", "")
+                visibility = payload.get("visibility", "private")
+                key = f"global/{file_name}" if visibility == "global" else f"{owner}/{file_name}"
+                entry = catalog.setdefault(key, asdict(DocumentInfo(
+                    file_name=file_name,
+                    owner=owner,
+                    visibility=visibility,
+                    chunk_count=0,
+                    size_bytes=payload.get("file_size") or 0,
+                    uploaded_at=payload.get("last_modified_date") or "",
+                )))
+                entry["chunk_count"] += 1
+            if offset is None:
+                break
+
+        file_utils.atomic_write_json(CATALOG_FILE, catalog, indent=4)
+        print(f"📚 Catalog backfilled from '{collection_name}' ({len(catalog)} documents)")
+
+
+def get_catalog(username, collection_name=None):
+    """
+    Returns the documents this user may see, newest first.
+    Same rule as the Qdrant filter: (visibility == 'global') OR (owner == username)
+    If there's no catalog yet, it is first backfilled from collection_name.
+    """
+    if collection_name and not os.path.exists(CATALOG_FILE):
+        try:
+            _backfill_catalog(collection_name)
+        except Exception as e:
+            print(f"Error backfilling catalog: {e}")
+
+    # Writers replace the file atomically, so a plain read is always consistent
+    catalog = _load_catalog()
+
+    docs = [
+        DocumentInfo(**entry) for entry in catalog.values()
+        if entry["visibility"] == "global" or entry["owner"] == username
+    ]
+    return sorted(docs, key=lambda d: d.uploaded_at, reverse=True)
+
+
 # --- NEW: PERMISSION FILTER GENERATOR ---
 def get_user_filters(username):
     """
@@ -68,4 +421,59 @@ def get_user_filters(username):
             MetadataFilter(key="owner", value=username),
         ],
         condition=FilterCondition.OR  # Match EITHER condition
-    )
\ No newline at end of file
+    )
+
+
+def get_user_qdrant_filter(username):
+    """
+    Same rule as get_user_filters, but as a raw Qdrant Filter for batch requests:
+    (visibility == 'global') OR (owner == username)
+    """
+    return rest.Filter(
+        should=[
+            rest.FieldCondition(key="visibility", match=rest.MatchValue(value="global")),
+            rest.FieldCondition(key="owner", match=rest.MatchValue(value=username)),
+        ]
+    )
+
+
+# --- BATCH RETRIEVAL (used by FYPService.answer_batch) ---
+def embed_queries(queries):
+    """Embeds all queries in a single model call."""
+    return inference_backends.embed_queries(Settings.embed_model, queries)
+
+
+def _get_dense_vector_name(client, collection_name):
+    """Returns the named dense vector of a collection, or None for the legacy unnamed layout."""
+    vectors = client.get_collection(collection_name).config.params.vectors
+    if isinstance(vectors, dict):
+        return "text-dense" if "text-dense" in vectors else next(iter(vectors))
+    return None
+
+
+def batch_search(collection_name, query_embeddings, usernames, top_k=10):
+    """
+    Runs one Qdrant batch request with one search per query.
+    Each search gets the RBAC filter of its own user.
+    Returns a list (one per query) of NodeWithScore lists.
+    """
+    client = get_client()
+    if not client: return [[] for _ in query_embeddings]
+
+    vector_name = _get_dense_vector_name(client, collection_name)
+    requests = [
+        rest.QueryRequest(
+            query=embedding,
+            using=vector_name,
+            filter=get_user_qdrant_filter(username),
+            limit=top_k,
+            with_payload=True,
+        )
+        for embedding, username in zip(query_embeddings, usernames)
+    ]
+    responses = client.query_batch_points(collection_name=collection_name, requests=requests)
+
+    return [
+        [NodeWithScore(node=metadata_dict_to_node(point.payload), score=point.score) for point in response.points]
+        for response in responses
+    ]
\ No newline at end of file
@@ -0,0 +1,98 @@
+# FYP_Workbench/stand_ins.py
+"""
+Offline stand-ins for the embedding model and the reranker, so tests can run the
+real pipeline (Qdrant local mode, dedup, parent store, batch answering) without
+downloading bge-small / ms-marco.
+
+Call install() BEFORE importing model_db: it picks its embedder at import time.
+"""
+import hashlib
+import math
+import re
+from typing import Any, List, Optional
+
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import MetadataMode, NodeWithScore, QueryBundle
+
+import inference_backends
+
+EMBED_DIM = 256
+
+
+def _words(text):
+    # Short words ("the", "how", "do") would make every text look related
+    return [w for w in re.findall(r"\w+", text.lower()) if len(w) > 3]
+
+
+class HashEmbedding(BaseEmbedding):
+    """Bag-of-words vectors hashed into EMBED_DIM buckets: texts sharing words score high."""
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashEmbedding"
+
+    def _vector(self, text):
+        vec = [0.0] * EMBED_DIM
+        for word in _words(text):
+            vec[int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % EMBED_DIM] += 1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._vector(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+class OverlapRerank(BaseNodePostprocessor):
+    """Cross-encoder stand-in: like ms-marco's logits, a score > 0 means relevant."""
+
+    top_n: int = 3
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "OverlapRerank"
+
+    def predict(self, pairs):
+        # Shared words minus one: a passage needs two query words to count as relevant
+        return [len(set(_words(query)) & set(_words(passage))) - 1.0 for query, passage in pairs]
+
+    def _postprocess_nodes(
+        self, nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None
+    ) -> List[NodeWithScore]:
+        pairs = [(query_bundle.query_str, n.node.get_content(metadata_mode=MetadataMode.EMBED)) for n in nodes]
+        for n, score in zip(nodes, self.predict(pairs)):
+            n.score = score
+        return sorted(nodes, key=lambda x: x.score, reverse=True)[:self.top_n]
+
+
+def _get_embed_model(backend=None):
+    return HashEmbedding()
+
+
+def _get_reranker(top_n=3, backend=None, **kwargs: Any):
+    return OverlapRerank(top_n=top_n)
+
+
+def install():
+    """Makes inference_backends hand out the stand-ins instead of the real models."""
+    inference_backends.get_embed_model = _get_embed_model
+    inference_backends.get_reranker = _get_reranker
+
+
+def use_scratch_stores(monkeypatch, tmp_path):
+    """Points model_db at a fresh qdrant-client in-memory instance and scratch files (pytest fixtures)."""
+    import model_db
+    from llama_index.core import Settings
+
+    monkeypatch.setattr(model_db, "QDRANT_PATH", ":memory:")
+    monkeypatch.setattr(model_db, "_client", None)
+    monkeypatch.setattr(model_db, "CATALOG_FILE", str(tmp_path / "doc_catalog.json"))
+    monkeypatch.setattr(model_db, "DEDUP_FILE", str(tmp_path / "dedup_index.db"))
+    monkeypatch.setattr(model_db, "PARENT_STORE_FILE", str(tmp_path / "parent_store.db"))
+    monkeypatch.setattr(Settings, "embed_model", HashEmbedding())
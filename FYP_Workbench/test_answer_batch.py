@@ -0,0 +1,63 @@
+# FYP_Workbench/test_answer_batch.py
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import stand_ins
+
+stand_ins.install()  # before model_db picks its embedder
+from llama_index.core.llms import MockLLM
+
+from fyp_service import FYPService
+from user_manager import User
+
+ALICE = User("alice", "pass", "Staff")
+BOB = User("bob", "pass", "Staff")
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    stand_ins.use_scratch_stores(monkeypatch, tmp_path)
+
+    svc = FYPService()
+    svc.llm = MockLLM()
+    svc.collection_name = "test_answer_batch"
+    return svc
+
+
+def upload(svc, tmp_path, user, file_name, text):
+    path = tmp_path / file_name
+    path.write_text(text)
+    ok, message = svc.upload_document(str(path), user)
+    assert ok, message
+
+
+def test_answer_batch_retrieves_per_user(service, tmp_path):
+    upload(service, tmp_path, ALICE, "refunds.txt",
+           "Customers may return items within thirty days of purchase for a full refund with a receipt.")
+    upload(service, tmp_path, BOB, "parking.txt",
+           "Staff parking permits are issued by reception and allow parking on level two of the garage.")
+
+    results = service.answer_batch(
+        ["How many days do customers have to return items for a refund?",
+         "Where are staff parking permits issued?"],
+        ALICE,
+    )
+
+    assert len(results) == 2
+    assert all(not r.error for r in results)
+    assert [s.file_name for s in results[0].source_nodes] == ["refunds.txt"]
+    # Bob's private document is never retrieved for Alice
+    assert results[1].source_nodes == []
+    assert {"embed_batch", "search_batch", "rerank_batch", "generate", "total"} <= set(results[0].timings)
+
+
+def test_answer_batch_records_retrieval_failure(service):
+    # Nothing uploaded: the collection doesn't exist, so the batch search fails
+    results = service.answer_batch(["How many days do customers have to return items?"], ALICE)
+
+    assert results[0].error
+    assert results[0].answer.startswith("[Error")
+    assert results[0].source_nodes == []
@@ -0,0 +1,43 @@
+# FYP_Workbench/test_catalog_questions.py
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from fyp_service import CATALOG_QUESTION_PATTERN
+
+# Inventory questions: answered straight from the document catalog
+CATALOG_QUESTIONS = [
+    "What documents do you have?",
+    "What files are available?",
+    "List my documents",
+    "list all files",
+    "How many documents do you have?",
+    "Which files did I upload?",
+]
+
+# Content questions that merely mention documents: must still go through RAG
+CONTENT_QUESTIONS = [
+    "What documents are required for a visa application?",
+    "Which documents do I need to bring on my first day?",
+    "What files are needed to claim expenses?",
+    "How many documents must a customer show to get a refund?",
+    "Show me the documents required for onboarding",
+    "What documents do you have about refunds?",
+]
+
+
+def test_catalog_questions_match():
+    for question in CATALOG_QUESTIONS:
+        assert CATALOG_QUESTION_PATTERN.search(question), f"should hit the catalog: {question!r}"
+
+
+def test_content_questions_do_not_match():
+    for question in CONTENT_QUESTIONS:
+        assert not CATALOG_QUESTION_PATTERN.search(question), f"should go to RAG: {question!r}"
+
+
+if __name__ == "__main__":
+    print("--- CATALOG QUESTION DETECTION TEST ---")
+    test_catalog_questions_match()
+    test_content_questions_do_not_match()
+    print("✅ All checks passed")
@@ -0,0 +1,112 @@
+# FYP_Workbench/test_dedup.py
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import stand_ins
+
+stand_ins.install()  # before model_db picks its embedder
+from llama_index.core.schema import TextNode
+
+import dedup
+import model_db
+
+REFUND_30 = "Customers may return items within 30 days of purchase with a receipt."
+REFUND_14 = "Customers may return items within 14 days of purchase with a receipt."
+
+
+@pytest.fixture
+def index(tmp_path):
+    return dedup.DedupIndex(str(tmp_path / "dedup_index.db"))
+
+
+def nothing_stored(ids):
+    return set()
+
+
+def chunks(*texts):
+    return [TextNode(text=t) for t in texts]
+
+
+def test_content_key_ignores_case_punctuation_and_whitespace():
+    assert dedup.content_key(REFUND_30) == dedup.content_key("  customers MAY return items, within 30 days\n"
+                                                             "of purchase with a receipt")
+    # A revised policy is different text, however similar
+    assert dedup.content_key(REFUND_30) != dedup.content_key(REFUND_14)
+    assert dedup.content_key("Items cannot be returned.") != dedup.content_key(
+        "Items can be returned for store credit.")
+
+
+def test_reservations_persist_per_scope(index):
+    key = dedup.content_key(REFUND_30)
+    with index.transaction():
+        index.reserve("global", key, "node-1")
+
+    reopened = dedup.DedupIndex(index.path)
+    with reopened.transaction():
+        assert reopened.find("global", key)[0] == "node-1"
+        assert reopened.find("private:alice", key) is None
+
+    reopened.release(["node-1"])
+    with reopened.transaction():
+        assert reopened.find("global", key) is None
+
+
+def test_failed_transaction_reserves_nothing(index):
+    with pytest.raises(RuntimeError):
+        with index.transaction():
+            index.reserve("global", "key", "node-1")
+            raise RuntimeError("embedding failed")
+    with index.transaction():
+        assert index.find("global", "key") is None
+
+
+def test_dedup_nodes_merges_only_identical_text(index):
+    first, _ = model_db._dedup_nodes(chunks(REFUND_30), index, "v1.txt", "global", find_stored=nothing_stored)
+    stored = {first[0].node_id}
+
+    unique, merged = model_db._dedup_nodes(
+        chunks(REFUND_30.upper(), REFUND_14, REFUND_14), index, "v2.txt", "global",
+        find_stored=lambda ids: ids & stored,
+    )
+
+    # Identical text is merged into the stored chunk; the revision is stored on its own, once
+    assert merged == {first[0].node_id: {"v2.txt"}}
+    assert [n.get_content() for n in unique] == [REFUND_14]
+    assert unique[0].metadata["file_refs"] == ["v2.txt"]
+
+
+def test_dedup_nodes_keeps_scopes_apart(index):
+    model_db._dedup_nodes(chunks(REFUND_30), index, "a.txt", "private:alice", find_stored=nothing_stored)
+    unique, merged = model_db._dedup_nodes(chunks(REFUND_30), index, "b.txt", "private:bob", find_stored=nothing_stored)
+    assert len(unique) == 1 and merged == {}
+
+
+def test_dedup_nodes_waits_for_in_progress_canonical(index, monkeypatch):
+    # Another upload reserved the chunk and is still embedding it: store our own copy, keep its claim
+    other, _ = model_db._dedup_nodes(chunks(REFUND_30), index, "a.txt", "global", find_stored=nothing_stored)
+    unique, merged = model_db._dedup_nodes(chunks(REFUND_30), index, "b.txt", "global", find_stored=nothing_stored)
+    assert len(unique) == 1 and merged == {}
+    with index.transaction():
+        assert index.find("global", dedup.content_key(REFUND_30))[0] == other[0].node_id
+
+    # Once the reservation is stale (upload failed, collection wiped) the next copy takes over
+    monkeypatch.setattr(dedup, "RESERVATION_TTL", -1)
+    unique, _ = model_db._dedup_nodes(chunks(REFUND_30), index, "c.txt", "global", find_stored=nothing_stored)
+    with index.transaction():
+        assert index.find("global", dedup.content_key(REFUND_30))[0] == unique[0].node_id
+
+
+def test_upload_merges_identical_chunks(tmp_path, monkeypatch):
+    stand_ins.use_scratch_stores(monkeypatch, tmp_path)
+    for name in ("v1.txt", "copy.txt", "v2.txt"):
+        (tmp_path / name).write_text(REFUND_14 if name == "v2.txt" else REFUND_30)
+        ok, message = model_db.upload_file(str(tmp_path / name), "test_dedup", "alice", "global")
+        assert ok, message
+
+    client = model_db.get_client()
+    points, _ = client.scroll("test_dedup", with_payload=True, limit=10)
+    refs = sorted((p.payload["file_name"], tuple(p.payload["file_refs"])) for p in points)
+    assert refs == [("v1.txt", ("v1.txt", "copy.txt")), ("v2.txt", ("v2.txt",))]
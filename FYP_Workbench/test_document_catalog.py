@@ -0,0 +1,56 @@
+# FYP_Workbench/test_document_catalog.py
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import stand_ins
+
+stand_ins.install()  # before model_db picks its embedder
+import model_db
+from fyp_service import FYPService
+from user_manager import User
+
+ALICE = User("alice", "pass", "Staff")
+BOB = User("bob", "pass", "Admin")
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    stand_ins.use_scratch_stores(monkeypatch, tmp_path)
+    svc = FYPService()
+    svc.collection_name = "test_document_catalog"
+    return svc
+
+
+def upload(svc, tmp_path, user, file_name, text, is_global=False):
+    path = tmp_path / file_name
+    path.write_text(text)
+    ok, message = svc.upload_document(str(path), user, is_global=is_global)
+    assert ok, message
+
+
+def test_catalog_backfilled_from_qdrant(service, tmp_path):
+    upload(service, tmp_path, ALICE, "refunds.txt", "Customers may return items within thirty days.")
+    upload(service, tmp_path, BOB, "handbook.txt", "Staff parking is on level two.", is_global=True)
+    upload(service, tmp_path, BOB, "salaries.txt", "Salary reviews happen every April.")
+
+    # A deployment that indexed these before the catalog existed
+    os.remove(model_db.CATALOG_FILE)
+
+    docs = service.list_documents(ALICE)
+    assert sorted((d.file_name, d.owner, d.visibility) for d in docs) == [
+        ("handbook.txt", "bob", "global"),
+        ("refunds.txt", "alice", "private"),
+    ]
+    assert all(d.chunk_count == 1 for d in docs)
+    assert os.path.exists(model_db.CATALOG_FILE)
+
+    answer = service._answer_from_catalog(ALICE)
+    assert "refunds.txt" in answer and "salaries.txt" not in answer
+
+
+def test_no_backfill_without_collection(service):
+    assert service.list_documents(ALICE) == []
+    assert not os.path.exists(model_db.CATALOG_FILE)
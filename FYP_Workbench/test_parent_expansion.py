@@ -0,0 +1,65 @@
+# FYP_Workbench/test_parent_expansion.py
+import sys
+import os
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import stand_ins
+
+stand_ins.install()  # before model_db picks its embedder
+from llama_index.core import Document
+from llama_index.core.schema import NodeWithScore
+
+import fyp_service
+import model_db
+from fyp_service import FYPService
+
+# ~2,400 words of policy text: several parent sections of PARENT_CHUNK_SIZE tokens
+POLICY = " ".join(
+    f"Section {i}. Refunds for order class {i} are handled by the finance team within {i + 2} days, "
+    f"and staff must log every refund for class {i} in the finance portal before the end of the day."
+    for i in range(80)
+)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    stand_ins.use_scratch_stores(monkeypatch, tmp_path)
+    monkeypatch.setattr(model_db, "CHUNKING_STRATEGY", "parent_child")
+    return FYPService()
+
+
+def top_hits(children, count):
+    """One child from each of the first `count` parents, like the reranker's top hits."""
+    hits, parents = [], set()
+    for child in children:
+        if child.metadata["parent_id"] not in parents:
+            parents.add(child.metadata["parent_id"])
+            hits.append(NodeWithScore(node=child, score=1.0))
+    return hits[:count]
+
+
+def test_top_hits_expand_to_typical_parents(service):
+    children, parents = model_db._split_documents([Document(text=POLICY)])
+    model_db._save_parents(parents)
+    assert len(parents) > 3
+
+    hits = top_hits(children, 3)
+    expanded = service._expand_to_parents(hits)
+
+    assert [n.node.get_content() for n in expanded] == [parents[n.metadata["parent_id"]] for n in hits]
+    used = sum(fyp_service._count_tokens(n.node.get_content()) for n in expanded)
+    assert used <= fyp_service.PARENT_CONTEXT_BUDGET
+
+
+def test_expansion_stops_at_budget(service):
+    children, parents = model_db._split_documents([Document(text=POLICY)])
+    model_db._save_parents(parents)
+
+    hits = top_hits(children, 3)
+    expanded = service._expand_to_parents(hits, budget=model_db.PARENT_CHUNK_SIZE)
+
+    # Only the best hit's parent fits; the others stay child-sized
+    assert expanded[0].node.get_content() == parents[hits[0].metadata["parent_id"]]
+    assert [n.node.get_content() for n in expanded[1:]] == [n.node.get_content() for n in hits[1:]]
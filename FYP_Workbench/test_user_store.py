@@ -0,0 +1,66 @@
+# FYP_Workbench/test_user_store.py
+import sys
+import os
+import tempfile
+import multiprocessing
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from user_manager import UserStore
+
+WORKERS = 4
+USERS_PER_WORKER = 25
+
+
+def _register_many(path, worker_id):
+    # Each process gets its own UserStore, like a separate Streamlit worker
+    store = UserStore(path)
+    for i in range(USERS_PER_WORKER):
+        username = f"w{worker_id}_u{i}"
+        store.update(lambda users: users.update({
+            username: {"username": username, "password": "pass", "role": "Staff"}
+        }))
+
+
+def test_no_lost_updates():
+    path = os.path.join(tempfile.mkdtemp(), "users_db.json")
+    UserStore(path).refresh()  # seeds the default Master Admin
+
+    workers = [
+        multiprocessing.Process(target=_register_many, args=(path, w)) for w in range(WORKERS)
+    ]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join()
+
+    users = UserStore(path).all()
+    assert len(users) == 1 + WORKERS * USERS_PER_WORKER, f"lost updates: {len(users)} users"
+    print(f"✅ {WORKERS} processes x {USERS_PER_WORKER} registrations, none lost")
+
+
+def test_no_stale_reads():
+    path = os.path.join(tempfile.mkdtemp(), "users_db.json")
+    writer, reader = UserStore(path), UserStore(path)
+    writer.update(lambda users: users.update({"bob": {"username": "bob", "password": "pass", "role": "Staff"}}))
+    reader.get("bob")
+    tick = os.stat(path).st_mtime_ns
+
+    # Worst case for a stat-based cache: two same-size writes between reads (a Staff <-> Admin
+    # role change plus a 4-char password change), the rename-based writes alternating between
+    # the same two inodes, and the mtime stuck in one coarse timestamp tick.
+    for i in range(20):
+        role = "Admin" if i % 2 == 0 else "Staff"
+        password = "word" if i % 2 == 0 else "pass"
+        writer.update(lambda users: users["bob"].update({"role": role}))
+        writer.update(lambda users: users["bob"].update({"password": password}))
+        os.utime(path, ns=(tick, tick))
+
+        seen = reader.get("bob")
+        assert (seen["role"], seen["password"]) == (role, password), f"stale read after round {i}: {seen}"
+    print("✅ 20 rounds of same-size writes in one timestamp tick, reader never stale")
+
+
+if __name__ == "__main__":
+    print("--- USER STORE CONCURRENCY TEST ---")
+    test_no_lost_updates()
+    test_no_stale_reads()
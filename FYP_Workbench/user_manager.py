@@ -1,13 +1,18 @@
 # FYP_Workbench/user_manager.py
 import json
 import os
+import threading
 from dataclasses import dataclass, asdict
 
+import file_utils
+
 # --- FIX: USE ABSOLUTE PATH ---
 # This ensures the DB is always in FYP_Workbench/, no matter where you run the terminal command.
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 USER_DB_FILE = os.path.join(BASE_DIR, "users_db.json")
 
+DEFAULT_USERS = {"master": {"username": "master", "password": "123", "role": "Master Admin"}}
+
 
 @dataclass
 class User:
@@ -16,29 +21,121 @@ class User:
     role: str  # 'Staff', 'Admin', 'Master Admin'
 
 
+class UserStore:
+    """
+    Shared view of users_db.json.
+    - Reads are in-memory dict lookups; the cache is reloaded only when the store's
+      version changes, so edits from other workers show up on the next call. Every
+      write bumps a counter in '<path>.version' (mtime/size/inode alone can miss two
+      same-size writes within one timestamp tick, e.g. a Staff<->Admin role change).
+    - Writes take an exclusive file lock, re-read the latest file, apply the change
+      and replace the file atomically (temp file + rename), so workers never clobber
+      each other and readers never see a half-written file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.version_path = path + ".version"
+        self._users = {}
+        self._stamp = None
+        self._mutex = threading.RLock()
+
+    # --- FILE PRIMITIVES (locking and atomic writes live in file_utils) ---
+    def _read_version(self):
+        try:
+            with open(self.version_path, 'r') as f:
+                return int(json.load(f))
+        except FileNotFoundError:
+            return 0
+
+    def _file_stamp(self):
+        # The version catches every write made through a UserStore; the stat
+        # fields still catch hand edits of users_db.json.
+        st = os.stat(self.path)
+        return self._read_version(), st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _read_file(self):
+        with open(self.path, 'r') as f:
+            return json.load(f)
+
+    # --- CACHE ---
+    def refresh(self):
+        """Reloads the cache if the file changed since we last read it."""
+        with self._mutex:
+            try:
+                stamp = self._file_stamp()
+            except FileNotFoundError:
+                # Create default Master Admin if db doesn't exist (another worker may beat us to it)
+                def seed_defaults(users):
+                    if not users:
+                        users.update(DEFAULT_USERS)
+
+                self.update(seed_defaults)
+                return
+            if stamp != self._stamp:
+                # Stamp is taken before reading, so a write racing with us only causes one extra reload
+                self._users = self._read_file()
+                self._stamp = stamp
+
+    def get(self, username):
+        self.refresh()
+        return self._users.get(username)
+
+    def all(self):
+        self.refresh()
+        return dict(self._users)
+
+    def update(self, change):
+        """
+        Applies change(users_dict) to the latest on-disk data under the file lock and
+        writes it back in one atomic replace. Returns whatever change() returns.
+        If change() raises, nothing is written.
+        """
+        with self._mutex, file_utils.file_lock(self.path):
+            users = self._read_file() if os.path.exists(self.path) else {}
+            result = change(users)
+            file_utils.atomic_write_json(self.path, users, indent=4)
+            # Bumped after the data, so a reader that sees the new version also sees the new data
+            file_utils.atomic_write_json(self.version_path, self._read_version() + 1)
+            self._users = users
+            self._stamp = self._file_stamp()
+            return result
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(path=None):
+    """One UserStore per file per process, shared by every UserManager / ChatViewModel."""
+    path = path or USER_DB_FILE
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = UserStore(path)
+        return _stores[path]
+
+
 class UserManager:
     def __init__(self):
-        self.users = self._load_users()
-
-    def _load_users(self):
-        if not os.path.exists(USER_DB_FILE):
-            # Create default Master Admin if db doesn't exist
-            defaults = {"master": {"username": "master", "password": "123", "role": "Master Admin"}}
-            self._save_users_to_file(defaults)
-            return defaults
-        with open(USER_DB_FILE, 'r') as f:
-            return json.load(f)
+        self._store = get_store(USER_DB_FILE)
+        self._store.refresh()
+
+    @property
+    def users(self):
+        """Snapshot of all accounts (username -> dict)."""
+        return self._store.all()
 
-    def _save_users_to_file(self, data):
-        with open(USER_DB_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
+    def get_user(self, username):
+        """Latest stored account, or None if it no longer exists."""
+        user_data = self._store.get(username)
+        return User(**user_data) if user_data else None
 
     def login(self, username, password):
         # FIX: Strip spaces so "master " works as "master"
         clean_user = username.strip()
         clean_pass = password.strip()
 
-        user_data = self.users.get(clean_user)
+        user_data = self._store.get(clean_user)
         if user_data and user_data['password'] == clean_pass:
             return User(**user_data)
         return None
@@ -48,27 +145,55 @@ class UserManager:
         if creator_role not in ["Admin", "Master Admin"]:
             raise PermissionError("Only Admins can register new users.")
 
-        if new_username in self.users:
-            raise ValueError("Username already exists.")
+        def add(users):
+            if new_username in users:
+                raise ValueError("Username already exists.")
+            users[new_username] = asdict(User(new_username, new_password, new_role))
 
-        self.users[new_username] = {
-            "username": new_username,
-            "password": new_password,
-            "role": new_role
-        }
-        self._save_users_to_file(self.users)
+        self._store.update(add)
         return f"User '{new_username}' created successfully."
 
+    def bulk_import(self, creator_role, accounts, overwrite=False):
+        """
+        Provisions many accounts in ONE locked write.
+        accounts: iterable of dicts with username/password/role (or User objects).
+        Existing usernames are skipped unless overwrite=True.
+        """
+        # Rule: same as register_user
+        if creator_role not in ["Admin", "Master Admin"]:
+            raise PermissionError("Only Admins can register new users.")
+
+        new_users = {}
+        for account in accounts:
+            data = asdict(account) if isinstance(account, User) else account
+            user = User(data["username"].strip(), data["password"], data["role"])
+            if not user.username:
+                raise ValueError("Username cannot be empty.")
+            new_users[user.username] = asdict(user)
+
+        def add_all(users):
+            skipped = 0
+            for username, data in new_users.items():
+                if username in users and not overwrite:
+                    skipped += 1
+                    continue
+                users[username] = data
+            return skipped
+
+        skipped = self._store.update(add_all)
+        return f"Imported {len(new_users) - skipped} users ({skipped} skipped: already exist)."
+
     def delete_user(self, creator_role, target_username):
         # Rule: Only Master Admin can delete users
         if creator_role != "Master Admin":
             raise PermissionError("Only Master Admin can delete users.")
 
-        if target_username not in self.users:
-            raise ValueError("User not found.")
+        def remove(users):
+            if target_username not in users:
+                raise ValueError("User not found.")
+            del users[target_username]
 
-        del self.users[target_username]
-        self._save_users_to_file(self.users)
+        self._store.update(remove)
         return f"User '{target_username}' deleted."
 
     def update_role(self, creator_role, target_username, new_role):
@@ -76,9 +201,10 @@ class UserManager:
         if creator_role != "Master Admin":
             raise PermissionError("Only Master Admin can update user roles.")
 
-        if target_username not in self.users:
-            raise ValueError("User not found.")
+        def change_role(users):
+            if target_username not in users:
+                raise ValueError("User not found.")
+            users[target_username]['role'] = new_role
 
-        self.users[target_username]['role'] = new_role
-        self._save_users_to_file(self.users)
-        return f"User '{target_username}' is now a {new_role}."
\ No newline at end of file
+        self._store.update(change_role)
+        return f"User '{target_username}' is now a {new_role}."
@@ -1,8 +1,8 @@
 # FYP_Workbench/view_model.py
-from typing import Optional, Iterator
+from typing import Optional, Iterator, List
 from fyp_service import FYPService
 from user_manager import UserManager, User
-from data_types import CRAGResult, SourceNode, ChatMessage
+from data_types import CRAGResult, SourceNode, ChatMessage, DocumentInfo
 from dataclasses import dataclass, field
 import history_manager
 
@@ -49,11 +49,24 @@ class ChatViewModel:
         self._string_history.clear()
         self.status_message = "Logged Out"
 
+    def _refresh_current_user(self):
+        """Picks up role changes / deletions made by other sessions since login."""
+        if not self.current_user:
+            return
+        latest = self._user_manager.get_user(self.current_user.username)
+        if latest is None:
+            self.logout()
+            self.status_message = "Your account no longer exists."
+        elif latest.role != self.current_user.role:
+            self.current_user = latest
+            self.status_message = f"Welcome, {latest.role} {latest.username}"
+
     # --- STREAMING CHAT ---
     def send_message(self, text: str) -> Iterator[ChatMessage]:
         """
         Yields the SAME ChatMessage object repeatedly, but with updated content.
         """
+        self._refresh_current_user()
         if not self.current_user:
             self.status_message = "You must log in first."
             return
@@ -94,6 +107,7 @@ class ChatViewModel:
 
     # --- USER MANAGEMENT (Master Admin/Admin Features) ---
     def register_user(self, new_user, new_pass, role):
+        self._refresh_current_user()
         if not self.current_user: return "Not Logged In"
         try:
             return self._user_manager.register_user(
@@ -103,6 +117,7 @@ class ChatViewModel:
             return str(e)
 
     def update_role(self, target_user, new_role):
+        self._refresh_current_user()
         if not self.current_user: return "Not Logged In"
         try:
             return self._user_manager.update_role(
@@ -112,6 +127,7 @@ class ChatViewModel:
             return str(e)
 
     def delete_user(self, target_user):
+        self._refresh_current_user()
         if not self.current_user: return "Not Logged In"
         try:
             return self._user_manager.delete_user(
@@ -120,12 +136,31 @@ class ChatViewModel:
         except Exception as e:
             return str(e)
 
+    def bulk_import_users(self, accounts, overwrite=False):
+        self._refresh_current_user()
+        if not self.current_user: return "Not Logged In"
+        try:
+            return self._user_manager.bulk_import(
+                self.current_user.role, accounts, overwrite
+            )
+        except Exception as e:
+            return str(e)
+
     # --- DOCUMENT UPLOAD ---
     def upload_document(self, file_path, is_global=False):
+        self._refresh_current_user()
         if not self.current_user: return "Not Logged In"
 
         success, msg = self._service.upload_document(
             file_path, self.current_user, is_global
         )
         self.status_message = msg
-        return msg
\ No newline at end of file
+        return msg
+
+    # --- DOCUMENT CATALOG ---
+    def get_document_catalog(self) -> List[DocumentInfo]:
+        """Documents the current user may see (for listing sources in the UI)."""
+        self._refresh_current_user()
+        if not self.current_user:
+            return []
+        return self._service.list_documents(self.current_user)
\ No newline at end of file